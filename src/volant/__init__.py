@@ -1,14 +1,34 @@
 # SPDX-FileCopyrightText: Copyright © 2025 Serban Giuroiu <giuroiu@gmail.com>
 # SPDX-License-Identifier: MIT
 
+import asyncio
+import atexit
 import base64
+import collections
 import collections.abc
+import contextvars
+import dataclasses
 import datetime
+import difflib
+import functools
+import glob
+import gzip
+import inspect
+import json
+import math
 import os
 import pathlib
 import pprint
+import queue
+import random
+import re
+import shutil
 import sys
+import threading
 import time
+import tracemalloc
+import types
+import typing
 
 # fmt: off
 RESET   = '\033[0m'
@@ -22,12 +42,61 @@ ORANGE  = '\033[91m'  # Solarized
 VIOLET  = '\033[95m'  # Solarized
 # fmt: on
 
+_ANSI = re.compile(r'\033\[[0-9;]*m|\033\][^\007]*\007')
 
-def _get_total_seconds(d: float | datetime.timedelta) -> int:
+
+class _Sink(typing.Protocol):
+  def write(self, s: str) -> None: ...
+  def flush(self) -> None: ...
+  def close(self) -> None: ...
+
+
+_sinks: list[_Sink] = []
+_capture: contextvars.ContextVar['capture | None'] = contextvars.ContextVar(
+  'volant.capture', default=None
+)
+_capture_tokens: contextvars.ContextVar[
+  tuple[contextvars.Token['capture | None'], ...]
+] = contextvars.ContextVar('volant.capture_tokens', default=())
+
+
+def _print(
+  level: str,
+  *parts: object,
+  args: tuple[object, ...] | None = None,
+  end: str = '\n',
+  flush: bool = False,
+) -> None:
+  if (recorder := _capture.get()) is None:
+    print(*parts, end=end, flush=flush)
+    if not _sinks:
+      return
+
+  text = ' '.join(str(part) for part in parts) + end
+  if recorder is not None:
+    recorder._add(Record(level, parts if args is None else args, text))
+  for sink in _sinks:
+    sink.write(text)
+
+
+def _close_sinks() -> None:
+  for sink in reversed(_sinks[:]):
+    sink.close()
+
+
+# Registered at import, so it runs after any exit hooks that scripts register.
+atexit.register(_close_sinks)
+
+
+def _get_seconds(d: float | datetime.timedelta) -> float:
   if (sec := d.total_seconds() if isinstance(d, datetime.timedelta) else d) < 0:
     raise ValueError(f'Duration must be non-negative. Got {d!r}')
 
-  return int(sec)
+  return sec
+
+
+def _get_total_seconds(d: float | datetime.timedelta) -> int:
+  return int(_get_seconds(d))
 
 
 def human_duration(
@@ -64,6 +133,33 @@ def human_duration(
   # fmt: on
 
 
+def human_bytes(n: int, *, compact: bool = False) -> str:
+  """Get a human-readable representation of a byte count in binary units.
+
+  Args:
+    n:
+      An integer number of bytes. Must be non-negative.
+    compact:
+      A boolean. Produce a shorter output string.
+
+  Returns:
+    A string.
+  """
+  if n < 0:
+    raise ValueError(f'Byte count must be non-negative. Got {n!r}')
+
+  s = '' if compact else ' '
+  value = float(n)
+  for unit in ['B', 'KiB', 'MiB', 'GiB', 'TiB']:
+    if value < 1024:
+      break
+    value /= 1024
+  else:
+    unit = 'PiB'
+
+  return f'{n:d}{s}B' if unit == 'B' else f'{value:.1f}{s}{unit}'
+
+
 def mark(b: bool | None) -> str:  # ruff: ignore[FBT001]
   """Get a colored '✓', '✗', or '∅' for True, False, and None, respectively."""
   return '∅' if b is None else (f'{GREEN}✓{RESET}' if b else f'{RED}✗{RESET}')
@@ -83,43 +179,45 @@ def tilde(p: str | os.PathLike[str]) -> str:
 def clip(s: str) -> None:
   """Write a string to the clipboard via the OSC 52 terminal escape sequence."""
   payload = base64.b64encode(s.encode()).decode()
-  print(f'\033]52;c;{payload}\007', end='', flush=True)
+  _print('clip', f'\033]52;c;{payload}\007', end='', flush=True)
 
 
 def title(s: str) -> None:
   """Set the terminal title."""
-  print(f'\033]0;{s}\007', end='', flush=True)
+  _print('title', f'\033]0;{s}\007', end='', flush=True)
 
 
 def debug(*args: object) -> None:
   """Print a debug message. Does nothing if running in PYTHONOPTIMIZE mode."""
   if __debug__:
-    print(f'{BLUE}%', *args, RESET)
+    _print('debug', f'{BLUE}%', *args, RESET, args=args)
 
 
 def message(*args: object) -> None:
   """Print an info message. Arguments are passed to built-in print()."""
-  print(f'{CYAN}❋', *args, RESET)
+  _print('message', f'{CYAN}❋', *args, RESET, args=args)
 
 
 def success(*args: object) -> None:
   """Print a success message. Arguments are passed to built-in print()."""
-  print(f'{GREEN}✓', *args, RESET)
+  _print('success', f'{GREEN}✓', *args, RESET, args=args)
 
 
 def result(*args: object) -> None:
   """Print a result message. Arguments are passed to built-in print()."""
-  print(f'{MAGENTA}→', *args, RESET)
+  _print('result', f'{MAGENTA}→', *args, RESET, args=args)
 
 
 def error(*args: object) -> None:
   """Print an error message. Arguments are passed to built-in print()."""
-  print(f'{RED}!', *args, RESET)
+  _print('error', f'{RED}!', *args, RESET, args=args)
 
 
 def die(*args: object) -> None:
   """Print an error message and die with exit status 1. Same args as print()."""
   error(*args)
+  for sink in _sinks:
+    sink.flush()
   sys.exit(1)
 
 
@@ -127,9 +225,9 @@ def indent(o: object) -> None:
   """Print an object and prefix two spaces to each non-blank line of output."""
   for line in str(o).splitlines():
     if l := line.rstrip():
-      print(' ', l)
+      _print('indent', ' ', l)
     else:
-      print()
+      _print('indent')
 
 
 def dump(o: object, *, width: int = 76) -> None:
@@ -140,24 +238,27 @@ def dump(o: object, *, width: int = 76) -> None:
 def bullets(l: collections.abc.Iterable[object]) -> None:
   """Print a bulleted list from the supplied iterable."""
   for item in l:
-    print('  ⁃', item)
+    _print('bullets', '  ⁃', item)
 
 
 def map(d: collections.abc.Mapping[object, object]) -> None:
   """Print a key-value pair list from the supplied mapping."""
   pad = max((len(str(k)) for k in d), default=0)
   for key, val in d.items():
-    print(f'  {key!s:>{pad}} : {val}')
+    _print('map', f'  {key!s:>{pad}} : {val}')
 
 
 def timestamp() -> None:
   """Print the current local time."""
-  print(f'  {"─" * 26}  {time.strftime("%Y-%m-%d %H:%M:%S")}  {"─" * 27}  ')
+  _print(
+    'timestamp',
+    f'  {"─" * 26}  {time.strftime("%Y-%m-%d %H:%M:%S")}  {"─" * 27}  ',
+  )
 
 
 def separator() -> None:
   """Print a nice horizontal line."""
-  print(f'  {"─" * 76}  ')
+  _print('separator', f'  {"─" * 76}  ')
 
 
 def heading(s: str) -> None:
@@ -166,9 +267,9 @@ def heading(s: str) -> None:
   line = '─' * pad
   text = f'{s:{pad}}'
 
-  print(f'╭─{line}─╮')
-  print(f'│ {text} │')
-  print(f'╰─{line}─╯')
+  _print('heading', f'╭─{line}─╮')
+  _print('heading', f'│ {text} │')
+  _print('heading', f'╰─{line}─╯')
 
 
 def wait(d: float | datetime.timedelta) -> datetime.timedelta:
@@ -187,25 +288,27 @@ def wait(d: float | datetime.timedelta) -> datetime.timedelta:
   total_seconds = _get_total_seconds(d)
   pad = len(human_duration(total_seconds))
 
-  print(f'{YELLOW}⏲ Waiting {human_duration(total_seconds)} {RESET}')
+  _print('wait', f'{YELLOW}⏲ Waiting {human_duration(total_seconds)} {RESET}')
 
   current_second = 0
   for second_being_processed in range(1, total_seconds + 1):
     if (current_second := second_being_processed % 60) == 1:
-      print('  ', end='', flush=True)
+      _print('wait', '  ', end='', flush=True)
     try:
       time.sleep(1)
     except KeyboardInterrupt:
       seconds_waited = second_being_processed - 1  # time.sleep() did not finish
-      print()
+      _print('wait')
       error(f'Interrupted after {human_duration(seconds_waited)}')
       return datetime.timedelta(seconds=seconds_waited)
-    print('.', end='', flush=True)
+    _print('wait', '.', end='', flush=True)
     if current_second == 0:
-      print(f'  {human_duration(second_being_processed):>{pad}}')
+      _print('wait', f'  {human_duration(second_being_processed):>{pad}}')
 
   if total_seconds > 0 and current_second > 0:
-    print(f'{" " * (60 - current_second)}  {human_duration(total_seconds)}')
+    _print(
+      'wait', f'{" " * (60 - current_second)}  {human_duration(total_seconds)}'
+    )
 
   return datetime.timedelta(seconds=total_seconds)
 
@@ -232,13 +335,763 @@ def confirm(prompt: str, *, enter: bool | None = None) -> bool:
   """
   try:
     while True:
-      print(f'{VIOLET}■ {prompt} {YELLOW}', end='', flush=True)
+      _print('confirm', f'{VIOLET}■ {prompt} {YELLOW}', end='', flush=True)
       if (response := input()) in ['y', 'n']:
         return response == 'y'
       elif type(enter) is bool and response == '':
         return enter
   except (EOFError, KeyboardInterrupt):
-    print()
+    _print('confirm')
     raise
   finally:
-    print(RESET, end='')
+    _print('confirm', RESET, end='')
+
+
+class Attempt:
+  """One try of a retry loop. Suppresses exceptions that the loop will retry."""
+
+  def __init__(self, policy: 'retry', number: int) -> None:
+    self.policy = policy
+    self.number = number
+    self.exception: Exception | None = None
+
+  def __enter__(self) -> typing.Self:
+    return self
+
+  def __exit__(
+    self,
+    typ: type[BaseException] | None,
+    exc: BaseException | None,
+    tb: types.TracebackType | None,
+  ) -> bool:
+    if isinstance(exc, Exception) and self.policy.retries(exc):
+      self.exception = exc
+      return True
+    return False
+
+
+class retry:
+  """Retry a flaky operation with exponential backoff.
+
+  Use an instance as a decorator for plain or coroutine functions, or iterate
+  over it and run each attempt inside a `with` block:
+
+    for attempt in volant.retry(OSError, deadline=60):
+      with attempt:
+        flaky()
+
+  Inside a coroutine, use `async for` instead, since `for` blocks the event
+  loop while it waits.
+
+  Each failed attempt is reported with error(). Synchronous waits go through
+  wait(), so SIGINT (Ctrl-C) stops waiting and re-raises the last exception;
+  their delays are rounded up to whole seconds, and to at least one second.
+  Coroutine functions and `async for` sleep with asyncio.sleep() and so do not
+  hold a thread.
+
+  Args:
+    on:
+      An exception type or tuple of exception types to retry. Others propagate.
+    when:
+      An optional predicate. Matching exceptions for which it returns False
+      propagate without further attempts.
+    attempts:
+      The maximum number of attempts, or None for no limit. Must be positive.
+    base:
+      The delay before the first retry, in seconds or as a datetime.timedelta.
+    cap:
+      The maximum delay between attempts.
+    deadline:
+      The total time budget, or None for no limit. Delays are shortened to
+      fit, and synchronous waits give up when less than a second remains.
+    jitter:
+      'full' for a random delay up to the exponential backoff, 'decorrelated'
+      for a random delay between base and three times the previous delay, or
+      None for plain exponential backoff.
+  """
+
+  def __init__(
+    self,
+    on: type[Exception] | tuple[type[Exception], ...] = Exception,
+    *,
+    when: collections.abc.Callable[[Exception], bool] | None = None,
+    attempts: int | None = 5,
+    base: float | datetime.timedelta = 1,
+    cap: float | datetime.timedelta = 60,
+    deadline: float | datetime.timedelta | None = None,
+    jitter: typing.Literal['full', 'decorrelated'] | None = 'full',
+  ) -> None:
+    if attempts is not None and attempts < 1:
+      raise ValueError(f'Attempts must be positive. Got {attempts!r}')
+    if jitter not in ('full', 'decorrelated', None):
+      raise ValueError(f'Unknown jitter. Got {jitter!r}')
+
+    self.on = on
+    self.when = when
+    self.attempts = attempts
+    self.base = _get_seconds(base)
+    self.cap = _get_seconds(cap)
+    self.deadline = None if deadline is None else _get_seconds(deadline)
+    self.jitter = jitter
+
+  def retries(self, e: Exception) -> bool:
+    """Return whether the exception is one this policy retries."""
+    return isinstance(e, self.on) and (self.when is None or self.when(e))
+
+  def delays(self) -> collections.abc.Iterator[float]:
+    """Yield the backoff schedule in seconds, one delay per retry."""
+    previous: float = self.base
+    ceiling = min(self.cap, self.base)
+    while True:
+      if self.jitter == 'full':
+        yield random.uniform(0, ceiling)
+      elif self.jitter == 'decorrelated':
+        previous = min(self.cap, random.uniform(self.base, previous * 3))
+        yield previous
+      else:
+        yield ceiling
+      ceiling = min(self.cap, ceiling * 2)
+
+  def _backoff(
+    self,
+    e: Exception,
+    number: int,
+    started: float,
+    delays: collections.abc.Iterator[float],
+    *,
+    whole: bool,
+  ) -> float | None:
+    error(f'Attempt {number} failed: {e!r}')
+
+    if self.attempts is not None and number >= self.attempts:
+      error(f'Giving up after {number} attempts')
+      return None
+
+    delay = next(delays)
+    if whole:
+      delay = max(1, math.ceil(delay))
+    if self.deadline is not None:
+      remaining = self.deadline - (time.monotonic() - started)
+      delay = min(delay, math.floor(remaining) if whole else remaining)
+      if remaining <= 0 or (whole and delay < 1):
+        error(f'Giving up after {_seconds(self.deadline)} deadline')
+        return None
+      message(f'Retrying with {_seconds(remaining)} left')
+
+    return delay
+
+  def _wait(self, delay: float) -> bool:
+    return wait(delay) == datetime.timedelta(seconds=int(delay))
+
+  def __iter__(self) -> collections.abc.Iterator[Attempt]:
+    started, delays, number = time.monotonic(), self.delays(), 0
+    while True:
+      number += 1
+      yield (attempt := Attempt(self, number))
+      if (e := attempt.exception) is None:
+        return
+      if (
+        delay := self._backoff(e, number, started, delays, whole=True)
+      ) is None:
+        raise e
+      if not self._wait(delay):
+        raise e
+
+  async def __aiter__(self) -> collections.abc.AsyncIterator[Attempt]:
+    started, delays, number = time.monotonic(), self.delays(), 0
+    while True:
+      number += 1
+      yield (attempt := Attempt(self, number))
+      if (e := attempt.exception) is None:
+        return
+      if (
+        delay := self._backoff(e, number, started, delays, whole=False)
+      ) is None:
+        raise e
+      message(f'Retrying in {_seconds(delay)}')
+      await asyncio.sleep(delay)
+
+  @typing.overload
+  def __call__[**P, R](
+    self,
+    f: collections.abc.Callable[P, collections.abc.Coroutine[None, None, R]],
+  ) -> collections.abc.Callable[
+    P, collections.abc.Coroutine[None, None, R]
+  ]: ...
+
+  @typing.overload
+  def __call__[**P, R](
+    self, f: collections.abc.Callable[P, R]
+  ) -> collections.abc.Callable[P, R]: ...
+
+  def __call__[**P, R](
+    self, f: collections.abc.Callable[P, R]
+  ) -> collections.abc.Callable[P, R] | collections.abc.Callable[P, typing.Any]:
+    if inspect.iscoroutinefunction(f):
+
+      @functools.wraps(f)
+      async def call_async(*args: P.args, **kwargs: P.kwargs) -> object:
+        started, delays, number = time.monotonic(), self.delays(), 0
+        while True:
+          number += 1
+          try:
+            return await f(*args, **kwargs)
+          except Exception as e:
+            if not self.retries(e):
+              raise
+            if (
+              delay := self._backoff(e, number, started, delays, whole=False)
+            ) is None:
+              raise
+            message(f'Retrying in {_seconds(delay)}')
+            await asyncio.sleep(delay)
+
+      return call_async
+
+    @functools.wraps(f)
+    def call(*args: P.args, **kwargs: P.kwargs) -> R:
+      started, delays, number = time.monotonic(), self.delays(), 0
+      while True:
+        number += 1
+        try:
+          return f(*args, **kwargs)
+        except Exception as e:
+          if not self.retries(e):
+            raise
+          if (
+            delay := self._backoff(e, number, started, delays, whole=True)
+          ) is None:
+            raise
+          if not self._wait(delay):
+            raise
+
+    return call
+
+
+class tee:
+  """Copy all helper output to a log file, without color codes.
+
+  The file is rotated once it would grow past max_bytes or once interval has
+  elapsed since it was opened. Rotated files get a timestamp suffix and are
+  gzip-compressed on a background thread, so writes only pay for a buffered
+  append. Buffered output is flushed by die(), close(), and interpreter exit.
+
+    with volant.tee('~/logs/backup.log', max_bytes=10_000_000):
+      volant.message('Backing up...')
+
+  Args:
+    path:
+      The log file. A leading '~' is expanded. Output is appended.
+    max_bytes:
+      The size at which to rotate, or None to never rotate by size.
+    interval:
+      The age at which to rotate, in seconds or as a datetime.timedelta, or
+      None to never rotate by time.
+    keep:
+      The number of rotated files to retain, or None to retain all of them.
+    compress:
+      A boolean. Compress rotated files with gzip.
+  """
+
+  def __init__(
+    self,
+    path: str | os.PathLike[str],
+    *,
+    max_bytes: int | None = None,
+    interval: float | datetime.timedelta | None = None,
+    keep: int | None = 5,
+    compress: bool = True,
+  ) -> None:
+    if max_bytes is not None and max_bytes < 1:
+      raise ValueError(f'Max bytes must be positive. Got {max_bytes!r}')
+    if interval is not None and _get_seconds(interval) == 0:
+      raise ValueError(f'Interval must be positive. Got {interval!r}')
+    if keep is not None and keep < 0:
+      raise ValueError(f'Keep must be non-negative. Got {keep!r}')
+
+    self.path = expanduser(path)
+    self.max_bytes = max_bytes
+    self.interval = None if interval is None else _get_seconds(interval)
+    self.keep = keep
+    self.compress = compress
+
+    self._lock = threading.RLock()
+    self._archiver: threading.Thread | None = None
+    self._rotated: queue.SimpleQueue[pathlib.Path | None] = queue.SimpleQueue()
+    self._open()
+    _sinks.append(self)
+
+  def _open(self) -> None:
+    self.path.parent.mkdir(parents=True, exist_ok=True)
+    self._file = self.path.open('ab')
+    self._size = self._file.tell()
+    self._opened = time.monotonic()
+
+  def _rotate(self) -> None:
+    self._file.close()
+    now = datetime.datetime.now()
+    rotated = self.path.with_name(f'{self.path.name}.{now:%Y%m%dT%H%M%S%f}')
+    self.path.rename(rotated)
+    self._open()
+
+    if self._archiver is None:
+      self._archiver = threading.Thread(
+        target=self._drain, name='volant-tee', daemon=True
+      )
+      try:
+        self._archiver.start()
+      except RuntimeError:  # No new threads during interpreter shutdown.
+        self._archiver = None
+        self._archive(rotated)
+        return
+    self._rotated.put(rotated)
+
+  def _drain(self) -> None:
+    while (rotated := self._rotated.get()) is not None:
+      self._archive(rotated)
+
+  def _archive(self, rotated: pathlib.Path) -> None:
+    try:
+      if self.compress:
+        with rotated.open('rb') as src:
+          with gzip.open(rotated.with_name(f'{rotated.name}.gz'), 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        rotated.unlink()
+
+      # Only finished archives, never files still waiting to be compressed.
+      if self.keep is not None:
+        suffix = '.gz' if self.compress else ''
+        pattern = f'{glob.escape(self.path.name)}.*{suffix}'
+        for old in sorted(self.path.parent.glob(pattern))[: -self.keep or None]:
+          old.unlink()
+    except OSError as e:
+      error(f'Could not archive {tilde(rotated)}: {e}')
+
+  def write(self, s: str) -> None:
+    """Append text to the log file, rotating it first if needed."""
+    data = _ANSI.sub('', s).encode()
+    with self._lock:
+      if self._file.closed:
+        return
+      if self._size and (
+        (self.max_bytes and self._size + len(data) > self.max_bytes)
+        or (
+          self.interval is not None
+          and time.monotonic() - self._opened >= self.interval
+        )
+      ):
+        self._rotate()
+      self._file.write(data)
+      self._size += len(data)
+
+  def flush(self) -> None:
+    """Flush buffered output to the log file."""
+    with self._lock:
+      if not self._file.closed:
+        self._file.flush()
+
+  def close(self) -> None:
+    """Stop copying output, close the log file, and finish compression."""
+    with self._lock:
+      if self in _sinks:
+        _sinks.remove(self)
+      self._file.close()
+      archiver, self._archiver = self._archiver, None
+    if archiver is not None:
+      self._rotated.put(None)
+      archiver.join()
+
+  def __enter__(self) -> typing.Self:
+    return self
+
+  def __exit__(
+    self,
+    typ: type[BaseException] | None,
+    exc: BaseException | None,
+    tb: types.TracebackType | None,
+  ) -> None:
+    self.close()
+
+
+class profile:
+  """Sample the stack of the current thread and report the hot spots.
+
+  A background thread snapshots the stack with sys._current_frames() at the
+  given rate, so the profiled code runs at full speed. Stacks are recorded
+  from the frame that entered the profile, or from the decorated function.
+  On exit, functions are printed ranked by self samples, where they were
+  running, next to their total share, where they were anywhere on the stack,
+  followed by the top call sites. Use an instance as a context manager, or as
+  a decorator to profile each call.
+
+  Args:
+    rate:
+      The number of samples per second. Must be positive.
+    top:
+      The number of functions and call sites to print. Must be positive.
+    collapsed:
+      An optional path for the samples in collapsed-stack format, one
+      'root;...;leaf count' line per distinct stack, for flame graph tools.
+  """
+
+  def __init__(
+    self,
+    *,
+    rate: float = 100,
+    top: int = 10,
+    collapsed: str | os.PathLike[str] | None = None,
+  ) -> None:
+    if rate <= 0:
+      raise ValueError(f'Rate must be positive. Got {rate!r}')
+    if top < 1:
+      raise ValueError(f'Top must be positive. Got {top!r}')
+
+    self.rate = rate
+    self.top = top
+    self.collapsed = None if collapsed is None else expanduser(collapsed)
+    self.samples: collections.Counter[tuple[tuple[types.CodeType, int], ...]]
+    self.samples = collections.Counter()
+    self.elapsed = datetime.timedelta()
+    self._running = False
+
+  def _sample(self, ident: int, stop: threading.Event) -> None:
+    while not stop.wait(1 / self.rate):
+      stack: list[tuple[types.CodeType, int]] = []
+      frame = sys._current_frames().get(ident)
+      while frame is not None:
+        stack.append((frame.f_code, frame.f_lineno))
+        frame = frame.f_back
+      if stop.is_set():  # The stack is in _finish(), not the profiled code.
+        break
+      if trimmed := tuple(reversed(stack))[self._skip :]:
+        self.samples[trimmed] += 1
+
+  def report(self) -> None:
+    """Print the top functions by self samples and the top call sites."""
+    if not (total := self.samples.total()):
+      message(f'No samples in {_seconds(self.elapsed.total_seconds())}')
+      return
+
+    own: collections.Counter[str] = collections.Counter()
+    cumulative: collections.Counter[str] = collections.Counter()
+    sites: collections.Counter[str] = collections.Counter()
+    for stack, count in self.samples.items():
+      for code in {code for code, _ in stack}:
+        cumulative[_where(code, code.co_firstlineno)] += count
+      leaf, line = stack[-1]
+      own[_where(leaf, leaf.co_firstlineno)] += count
+      sites[_where(leaf, line)] += count
+
+    elapsed = _seconds(self.elapsed.total_seconds())
+    samples = f'{total:,} samples in {elapsed}'
+    ranked = sorted(
+      cumulative, key=lambda k: (own[k], cumulative[k]), reverse=True
+    )
+    heading(f'Functions · {samples}')
+    map(
+      {
+        k: f'{own[k] / total:6.1%} self  {cumulative[k] / total:6.1%} total'
+        for k in ranked[: self.top]
+      }
+    )
+    heading(f'Call Sites · {samples}')
+    map({k: f'{v / total:6.1%}' for k, v in sites.most_common(self.top)})
+
+  def write_collapsed(self, path: str | os.PathLike[str]) -> None:
+    """Write the samples to a file in collapsed-stack format."""
+    with expanduser(path).open('w') as f:
+      for stack, count in self.samples.items():
+        frames = ';'.join(_where(code, line) for code, line in stack)
+        f.write(f'{frames} {count}\n')
+
+  def _start(self, skip: int) -> None:
+    if self._running:
+      raise RuntimeError('Profile is already running')
+
+    self._running = True
+    self.samples.clear()
+    self._skip = skip
+    self._started = time.monotonic()
+    self._stop = threading.Event()
+    self._sampler = threading.Thread(
+      target=self._sample,
+      args=(threading.get_ident(), self._stop),
+      name='volant-profile',
+      daemon=True,
+    )
+    self._sampler.start()
+
+  def _finish(self) -> None:
+    self._stop.set()
+    self._sampler.join()
+    self._running = False
+    self.elapsed = datetime.timedelta(seconds=time.monotonic() - self._started)
+    self.report()
+    if self.collapsed is not None:
+      self.write_collapsed(self.collapsed)
+
+  def __enter__(self) -> typing.Self:
+    self._start(_depth(sys._getframe(1)) - 1)  # Keep the entering frame.
+    return self
+
+  def __exit__(
+    self,
+    typ: type[BaseException] | None,
+    exc: BaseException | None,
+    tb: types.TracebackType | None,
+  ) -> None:
+    self._finish()
+
+  def __call__[**P, R](
+    self, f: collections.abc.Callable[P, R]
+  ) -> collections.abc.Callable[P, R]:
+    @functools.wraps(f)
+    def call(*args: P.args, **kwargs: P.kwargs) -> R:
+      p = profile(rate=self.rate, top=self.top, collapsed=self.collapsed)
+      p._start(_depth(sys._getframe()))  # Start at f, below this wrapper.
+      try:
+        return f(*args, **kwargs)
+      finally:
+        p._finish()
+
+    return call
+
+
+def _depth(frame: types.FrameType | None) -> int:
+  depth = 0
+  while frame is not None:
+    depth, frame = depth + 1, frame.f_back
+  return depth
+
+
+def _where(code: types.CodeType, line: int) -> str:
+  return f'{code.co_qualname} ({tilde(code.co_filename)}:{line})'
+
+
+def usage(
+  *, memory: bool = False, jsonl: str | os.PathLike[str] | None = None
+) -> None:
+  """Print a resource usage report when the interpreter exits.
+
+  The report covers wall time since this call plus CPU time, peak RSS, page
+  faults, block I/O, and context switches from resource.getrusage() for this
+  process and, if they used any, its waited-for child processes.
+
+  Args:
+    memory:
+      A boolean. Start tracemalloc and include the peak traced Python memory.
+    jsonl:
+      An optional path. The same figures are appended as a line of JSON, so
+      that runs can be compared over time.
+  """
+  import resource  # noqa: F401  # Unix only. Fail now rather than at exit.
+
+  if memory:
+    tracemalloc.start()
+  atexit.register(_report_usage, time.monotonic(), jsonl)
+
+
+def _rusage(who: int) -> dict[str, float]:
+  import resource  # Unix only
+
+  r = resource.getrusage(who)
+  return {
+    'user_seconds': r.ru_utime,
+    'system_seconds': r.ru_stime,
+    'max_rss_bytes': r.ru_maxrss * (1 if sys.platform == 'darwin' else 1024),
+    'minor_faults': r.ru_minflt,
+    'major_faults': r.ru_majflt,
+    'block_inputs': r.ru_inblock,
+    'block_outputs': r.ru_oublock,
+    'voluntary_switches': r.ru_nvcsw,
+    'involuntary_switches': r.ru_nivcsw,
+  }
+
+
+def _seconds(t: float) -> str:
+  return f'{t:.3f}s' if t < 60 else human_duration(t)
+
+
+def _usage_lines(u: dict[str, float]) -> dict[object, object]:
+  # fmt: off
+  return {
+    'User CPU':         _seconds(u['user_seconds']),
+    'System CPU':       _seconds(u['system_seconds']),
+    'Peak RSS':         human_bytes(int(u['max_rss_bytes'])),
+    'Page faults':      f'{u["minor_faults"]:,} minor, '
+                        f'{u["major_faults"]:,} major',
+    'Block I/O':        f'{u["block_inputs"]:,} in, '
+                        f'{u["block_outputs"]:,} out',
+    'Context switches': f'{u["voluntary_switches"]:,} voluntary, '
+                        f'{u["involuntary_switches"]:,} involuntary',
+  }
+  # fmt: on
+
+
+def _report_usage(started: float, jsonl: str | os.PathLike[str] | None) -> None:
+  import resource  # Unix only
+
+  wall = time.monotonic() - started
+  own, children = (
+    _rusage(resource.RUSAGE_SELF),
+    _rusage(resource.RUSAGE_CHILDREN),
+  )
+  peak = (
+    tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+  )
+
+  heading('Resource Usage')
+  lines: dict[object, object] = {
+    'Wall time': _seconds(wall),
+    **_usage_lines(own),
+  }
+  if peak is not None:
+    lines['Python peak'] = human_bytes(peak)
+  map(lines)
+
+  if any(children.values()):
+    heading('Child Processes')
+    map(_usage_lines(children))
+
+  if jsonl is not None:
+    record = {
+      'time': datetime.datetime.now()
+      .astimezone()
+      .isoformat(timespec='seconds'),
+      'argv': sys.argv,
+      'wall_seconds': wall,
+      'self': own,
+      'children': children,
+      'tracemalloc_peak_bytes': peak,
+    }
+    path = expanduser(jsonl)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open('a') as f:
+      f.write(json.dumps(record) + '\n')
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Record:
+  """One piece of helper output, as recorded by capture.
+
+  Attributes:
+    level:
+      The name of the helper that produced the output, like 'message'.
+    args:
+      The arguments of the message helpers, or the printed values otherwise.
+    text:
+      The rendered output, including color codes and the line ending.
+  """
+
+  level: str
+  args: tuple[object, ...]
+  text: str
+
+  @property
+  def plain(self) -> str:
+    """The rendered output without color codes or terminal escapes."""
+    return _ANSI.sub('', self.text)
+
+
+class capture:
+  """Record helper output in memory instead of printing it to stdout.
+
+  Meant for testing scripts: recording skips stdout entirely, so there is no
+  redirection to set up and the color codes stay inspectable. The active
+  capture is held in a context variable, so captures in different threads or
+  asyncio tasks are independent, and tasks created inside a capture feed it.
+  New threads start without a capture; run their target through
+  contextvars.copy_context().run to have them feed the current one, or enter
+  the same capture from each of them. Captures nest, and only the innermost
+  one records. Any tee keeps receiving output.
+
+    with volant.capture() as out:
+      volant.message('Hello')
+    assert out.plain == '❋ Hello \\n'
+  """
+
+  def __init__(self) -> None:
+    self._lock = threading.Lock()
+    self._records: list[Record] = []
+
+  def _add(self, record: Record) -> None:
+    with self._lock:
+      self._records.append(record)
+
+  @property
+  def records(self) -> list[Record]:
+    """A copy of the records so far, in order."""
+    with self._lock:
+      return list(self._records)
+
+  @property
+  def text(self) -> str:
+    """All output so far, including color codes."""
+    return ''.join(record.text for record in self.records)
+
+  @property
+  def plain(self) -> str:
+    """All output so far, without color codes or terminal escapes."""
+    return _ANSI.sub('', self.text)
+
+  def clear(self) -> None:
+    """Discard the records so far."""
+    with self._lock:
+      self._records.clear()
+
+  def golden(
+    self,
+    path: str | os.PathLike[str],
+    *,
+    ansi: bool = False,
+    update: bool | None = None,
+  ) -> None:
+    """Compare the output so far with the contents of a golden file.
+
+    Args:
+      path:
+        The golden file. A leading '~' is expanded.
+      ansi:
+        A boolean. Compare the output including color codes.
+      update:
+        A boolean. Write the output to the golden file instead of comparing.
+        Defaults to whether $VOLANT_UPDATE_GOLDEN is set and non-empty.
+
+    Raises:
+      AssertionError:
+        If the output differs. The message is a unified diff.
+      FileNotFoundError:
+        If the golden file does not exist and update is not set.
+    """
+    actual = self.text if ansi else self.plain
+    golden = expanduser(path)
+
+    if update is None:
+      update = bool(os.environ.get('VOLANT_UPDATE_GOLDEN'))
+    if update:
+      golden.parent.mkdir(parents=True, exist_ok=True)
+      golden.write_text(actual, newline='')
+      return
+
+    if (expected := golden.read_text(newline='')) != actual:
+      diff = difflib.unified_diff(
+        expected.splitlines(keepends=True),
+        actual.splitlines(keepends=True),
+        tilde(golden),
+        'captured',
+      )
+      raise AssertionError(''.join(diff))
+
+  def __enter__(self) -> typing.Self:
+    _capture_tokens.set((*_capture_tokens.get(), _capture.set(self)))
+    return self
+
+  def __exit__(
+    self,
+    typ: type[BaseException] | None,
+    exc: BaseException | None,
+    tb: types.TracebackType | None,
+  ) -> None:
+    *tokens, token = _capture_tokens.get()
+    _capture_tokens.set(tuple(tokens))
+    _capture.reset(token)
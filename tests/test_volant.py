@@ -1,14 +1,25 @@
 # SPDX-FileCopyrightText: Copyright © 2025 Serban Giuroiu <giuroiu@gmail.com>
 # SPDX-License-Identifier: MIT
 
+import asyncio
 import collections.abc
+import concurrent.futures
 import contextlib
+import contextvars
 import datetime
 import functools
+import gzip
 import io
 import itertools
+import json
 import os
 import pathlib
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
 import unittest.mock
 import zoneinfo
@@ -110,6 +121,80 @@ kWait180SecondsInterrupted = """
 \033[31m! Interrupted after 2m 03s \033[0m
 """.lstrip()
 
+kRetrySucceeded = """
+\033[31m! Attempt 1 failed: OSError('flake') \033[0m
+\033[33m⏲ Waiting 1s \033[0m
+  .                                                             1s
+\033[31m! Attempt 2 failed: OSError('flake') \033[0m
+\033[33m⏲ Waiting 2s \033[0m
+  ..                                                            2s
+""".lstrip()
+
+kRetryGaveUp = """
+\033[31m! Attempt 1 failed: OSError('flake') \033[0m
+\033[33m⏲ Waiting 1s \033[0m
+  .                                                             1s
+\033[31m! Attempt 2 failed: OSError('flake') \033[0m
+\033[31m! Giving up after 2 attempts \033[0m
+""".lstrip()
+
+kRetryDeadline = """
+\033[31m! Attempt 1 failed: KeyError('k') \033[0m
+\033[36m❋ Retrying with 3.000s left \033[0m
+\033[33m⏲ Waiting 2s \033[0m
+  ..                                                            2s
+\033[31m! Attempt 2 failed: KeyError('k') \033[0m
+\033[36m❋ Retrying with 1.000s left \033[0m
+\033[33m⏲ Waiting 1s \033[0m
+  .                                                             1s
+\033[31m! Attempt 3 failed: KeyError('k') \033[0m
+\033[31m! Giving up after 4.000s deadline \033[0m
+""".lstrip()
+
+kRetryShortDeadline = """
+\033[31m! Attempt 1 failed: KeyError('k') \033[0m
+\033[36m❋ Retrying with 1.500s left \033[0m
+\033[33m⏲ Waiting 1s \033[0m
+  .                                                             1s
+\033[31m! Attempt 2 failed: KeyError('k') \033[0m
+\033[31m! Giving up after 1.500s deadline \033[0m
+""".lstrip()
+
+kRetryInterrupted = """
+\033[31m! Attempt 1 failed: OSError('flake') \033[0m
+\033[33m⏲ Waiting 4s \033[0m
+  ..
+\033[31m! Interrupted after 2s \033[0m
+""".lstrip()
+
+kRetryAsync = """
+\033[31m! Attempt 1 failed: TimeoutError('slow') \033[0m
+\033[36m❋ Retrying in 3.000s \033[0m
+""".lstrip()
+
+kUsage = """
+╭──────────────────────────────────────────────────────────────────────────────╮
+│ Resource Usage                                                               │
+╰──────────────────────────────────────────────────────────────────────────────╯
+         Wall time : 1m 05s
+          User CPU : 1.250s
+        System CPU : 0.500s
+          Peak RSS : 30.0 MiB
+       Page faults : 6,206 minor, 1 major
+         Block I/O : 144 in, 16 out
+  Context switches : 21 voluntary, 2,024 involuntary
+       Python peak : 7.7 MiB
+╭──────────────────────────────────────────────────────────────────────────────╮
+│ Child Processes                                                              │
+╰──────────────────────────────────────────────────────────────────────────────╯
+          User CPU : 2m 03s
+        System CPU : 0.016s
+          Peak RSS : 2.0 MiB
+       Page faults : 15 minor, 0 major
+         Block I/O : 0 in, 8 out
+  Context switches : 3 voluntary, 1 involuntary
+""".lstrip('\n')
+
 type Duration = float | datetime.timedelta
 
 # https://github.com/python/typeshed/blob/main/stdlib/_typeshed/__init__.pyi
@@ -232,6 +317,28 @@ class VolantTest(unittest.TestCase):
       with self.subTest(arg):
         self.assertEqual(out, volant.human_duration(arg, compact=True))
 
+  def test_human_bytes(self) -> None:
+    with self.assertRaises(ValueError):
+      volant.human_bytes(-1)
+
+    # fmt: off
+    for out, compact, arg in [
+      (        '0 B',         '0B',          0),
+      (     '1023 B',      '1023B',      1_023),
+      (    '1.0 KiB',     '1.0KiB',      1_024),
+      (    '1.5 KiB',     '1.5KiB',      1_536),
+      (    '1.0 MiB',     '1.0MiB',  1_048_576),
+      (   '30.0 MiB',    '30.0MiB', 31_481_856),
+      (    '2.0 GiB',     '2.0GiB',      2**31),
+      (    '1.0 TiB',     '1.0TiB',      2**40),
+      (    '1.0 PiB',     '1.0PiB',      2**50),
+      ( '2048.0 PiB',  '2048.0PiB',      2**61),
+    ]:
+    # fmt: on
+      with self.subTest(arg):
+        self.assertEqual(out, volant.human_bytes(arg))
+        self.assertEqual(compact, volant.human_bytes(arg, compact=True))
+
   def test_mark(self) -> None:
     for out, arg in [
       ('∅', None),
@@ -512,3 +619,762 @@ class VolantTest(unittest.TestCase):
         with self.assertRaises(KeyboardInterrupt):
           volant.confirm('Stop?')
       self.assertEqual('\033[95m■ Stop? \033[33m\n\033[0m', buffer.getvalue())
+
+  def test_retry(self) -> None:
+    for kwargs in [{'attempts': 0}, {'jitter': 'partial'}, {'base': -1}]:
+      with self.subTest(kwargs):
+        with self.assertRaises(ValueError):
+          volant.retry(**kwargs)  # type: ignore[arg-type]
+
+    with unittest.mock.patch(
+      'random.uniform', side_effect=[0.5, 1.5, 2.75]
+    ) as m:
+      self.assertEqual(
+        [0.5, 1.5, 2.75],
+        list(itertools.islice(volant.retry(cap=3).delays(), 3)),
+      )
+      m.assert_has_calls([unittest.mock.call(0, c) for c in [1, 2, 3]])
+    with unittest.mock.patch('random.uniform', side_effect=[2.5, 9.0]) as m:
+      self.assertEqual(
+        [2.5, 5],
+        list(
+          itertools.islice(
+            volant.retry(base=2, cap=5, jitter='decorrelated').delays(), 2
+          )
+        ),
+      )
+      m.assert_has_calls([unittest.mock.call(2, 6), unittest.mock.call(2, 7.5)])
+    self.assertEqual(
+      [2, 4, 8, 10, 10],
+      list(
+        itertools.islice(volant.retry(base=2, cap=10, jitter=None).delays(), 5)
+      ),
+    )
+    self.assertEqual(
+      [0.25, 0.5, 0.75, 0.75],
+      list(
+        itertools.islice(
+          volant.retry(base=0.25, cap=0.75, jitter=None).delays(), 4
+        )
+      ),
+    )
+    half = datetime.timedelta(milliseconds=500)
+    self.assertEqual(
+      [0.5, 0.5],
+      list(
+        itertools.islice(
+          volant.retry(base=half, cap=half, jitter=None).delays(), 2
+        )
+      ),
+    )
+
+    def flaky(failures: int) -> collections.abc.Callable[[], str]:
+      calls = itertools.count(1)
+
+      def f() -> str:
+        if next(calls) <= failures:
+          raise OSError('flake')
+        return 'done'
+
+      return f
+
+    with contextlib.redirect_stdout(io.StringIO()) as buffer:
+      with unittest.mock.patch('time.sleep'):
+        f = volant.retry(OSError, attempts=3, jitter=None)(flaky(2))
+        self.assertEqual('done', f())
+        self.assertEqual(kRetrySucceeded, buffer.getvalue())
+
+    with contextlib.redirect_stdout(io.StringIO()) as buffer:
+      with unittest.mock.patch('time.sleep') as sleep:
+        f = volant.retry(OSError, attempts=3, base=0.25, jitter=None)(flaky(2))
+        self.assertEqual('done', f())
+        self.assertEqual(2, sleep.call_count)
+        self.assertEqual(2, buffer.getvalue().count('⏲ Waiting 1s'))
+
+    with contextlib.redirect_stdout(io.StringIO()) as buffer:
+      with unittest.mock.patch('time.sleep'):
+        with self.assertRaises(OSError):
+          for attempt in volant.retry(OSError, attempts=2, jitter=None):
+            with attempt:
+              flaky(2)()
+        self.assertEqual(kRetryGaveUp, buffer.getvalue())
+        self.assertEqual(2, attempt.number)
+
+    with contextlib.redirect_stdout(io.StringIO()) as buffer:
+      with unittest.mock.patch('time.sleep'):
+        with self.assertRaises(OSError):
+          volant.retry(OSError, attempts=2, jitter=None)(flaky(2))()
+        self.assertEqual(kRetryGaveUp, buffer.getvalue())
+
+    with contextlib.redirect_stdout(io.StringIO()) as buffer:
+      with unittest.mock.patch('time.sleep'):
+        for attempt in volant.retry(OSError, attempts=3, jitter=None):
+          with attempt:
+            self.assertEqual('done', f())
+        self.assertEqual(1, attempt.number)
+        with self.assertRaises(ZeroDivisionError):
+          with next(iter(volant.retry(OSError))):
+            1 / 0  # noqa: B018
+        self.assertEqual('', buffer.getvalue())
+
+    with contextlib.redirect_stdout(io.StringIO()) as buffer:
+      with unittest.mock.patch('time.sleep') as sleep:
+        with self.assertRaises(OSError):
+          volant.retry(ValueError)(flaky(1))()
+        with self.assertRaises(OSError):
+          volant.retry(when=lambda e: 'flake' not in str(e))(flaky(1))()
+        self.assertEqual('', buffer.getvalue())
+        sleep.assert_not_called()
+
+    with contextlib.redirect_stdout(io.StringIO()) as buffer:
+      with unittest.mock.patch('time.sleep'):
+        with unittest.mock.patch('time.monotonic', side_effect=[0, 1, 3, 5]):
+          with self.assertRaises(KeyError):
+            for attempt in volant.retry(deadline=4, base=2, jitter=None):
+              with attempt:
+                raise KeyError('k')
+        self.assertEqual(kRetryDeadline, buffer.getvalue())
+
+    with contextlib.redirect_stdout(io.StringIO()) as buffer:
+      with unittest.mock.patch('time.sleep') as sleep:
+        with unittest.mock.patch('time.monotonic', side_effect=[0, 0, 1]):
+          with self.assertRaises(KeyError):
+            for attempt in volant.retry(deadline=1.5, jitter=None):
+              with attempt:
+                raise KeyError('k')
+        self.assertEqual(kRetryShortDeadline, buffer.getvalue())
+        self.assertEqual(1, sleep.call_count)
+
+    def iterate(f: collections.abc.Callable[[], str]) -> None:
+      for attempt in volant.retry(base=4, jitter=None):
+        with attempt:
+          f()
+
+    runs: list[tuple[str, collections.abc.Callable[[], object]]] = [
+      ('decorator', lambda: volant.retry(base=4, jitter=None)(flaky(1))()),
+      ('iterator', lambda: iterate(flaky(1))),
+    ]
+    for sub, run in runs:
+      with self.subTest(sub):
+        with contextlib.redirect_stdout(io.StringIO()) as buffer:
+          with unittest.mock.patch('time.sleep') as sleep:
+            sleep.side_effect = [None] * 2 + [KeyboardInterrupt]
+            with self.assertRaises(OSError):
+              run()
+            self.assertEqual(kRetryInterrupted, buffer.getvalue())
+
+  def test_retry_async(self) -> None:
+    async def iterate(failures: int) -> int:
+      async for attempt in volant.retry(OSError, jitter=None):
+        with attempt:
+          if attempt.number <= failures:
+            raise OSError('flake')
+      return attempt.number
+
+    with contextlib.redirect_stdout(io.StringIO()) as buffer:
+      with unittest.mock.patch('time.sleep') as blocking:
+        with unittest.mock.patch('asyncio.sleep') as sleep:
+          self.assertEqual(3, asyncio.run(iterate(2)))
+          sleep.assert_has_awaits(
+            [unittest.mock.call(1), unittest.mock.call(2)]
+          )
+          blocking.assert_not_called()
+    self.assertEqual(
+      "\033[31m! Attempt 1 failed: OSError('flake') \033[0m\n"
+      '\033[36m❋ Retrying in 1.000s \033[0m\n'
+      "\033[31m! Attempt 2 failed: OSError('flake') \033[0m\n"
+      '\033[36m❋ Retrying in 2.000s \033[0m\n',
+      buffer.getvalue(),
+    )
+
+    async def give_up_iterating() -> None:
+      async for attempt in volant.retry(OSError, attempts=1):
+        with attempt:
+          raise OSError('flake')
+
+    with contextlib.redirect_stdout(io.StringIO()):
+      with self.assertRaises(OSError):
+        asyncio.run(give_up_iterating())
+
+    calls = itertools.count(1)
+
+    @volant.retry(TimeoutError, base=3, jitter=None)
+    async def fetch(url: str) -> str:
+      if next(calls) == 1:
+        raise TimeoutError('slow')
+      return url
+
+    with contextlib.redirect_stdout(io.StringIO()) as buffer:
+      with unittest.mock.patch('asyncio.sleep') as sleep:
+        self.assertEqual(
+          'https://example.com', asyncio.run(fetch('https://example.com'))
+        )
+        self.assertEqual(kRetryAsync, buffer.getvalue())
+        sleep.assert_awaited_once_with(3)
+
+    @volant.retry(TimeoutError, attempts=2, base=0.25, jitter=None)
+    async def quick() -> None:
+      raise TimeoutError('slow')
+
+    with contextlib.redirect_stdout(io.StringIO()):
+      with unittest.mock.patch('asyncio.sleep') as sleep:
+        with self.assertRaises(TimeoutError):
+          asyncio.run(quick())
+        sleep.assert_awaited_once_with(0.25)
+
+    @volant.retry(TimeoutError, attempts=1)
+    async def give_up() -> None:
+      raise TimeoutError('slow')
+
+    @volant.retry(TimeoutError)
+    async def wrong() -> None:
+      raise KeyError('k')
+
+    with contextlib.redirect_stdout(io.StringIO()):
+      with self.assertRaises(TimeoutError):
+        asyncio.run(give_up())
+      with self.assertRaises(KeyError):
+        asyncio.run(wrong())
+
+  def test_tee(self) -> None:
+    for kwargs in [
+      {'max_bytes': 0},
+      {'keep': -1},
+      {'interval': -1},
+      {'interval': 0},
+      {'interval': datetime.timedelta()},
+    ]:
+      with self.subTest(kwargs):
+        with tempfile.TemporaryDirectory() as tmp:
+          with self.assertRaises(ValueError):
+            volant.tee(pathlib.Path(tmp, 'out.log'), **kwargs)  # type: ignore[arg-type]
+
+    with tempfile.TemporaryDirectory() as tmp:
+      path = pathlib.Path(tmp, 'logs', 'out.log')
+      with contextlib.redirect_stdout(io.StringIO()) as buffer:
+        with volant.tee(path) as log:
+          volant.message('Hello')
+          volant.map({'a': 1})
+          volant.title('Not logged')
+          self.assertEqual(b'', path.read_bytes())
+          log.flush()
+          self.assertEqual('❋ Hello \n  a : 1\n', path.read_text())
+        volant.success('Not logged either')
+        log.write('Ignored after close')
+        log.flush()
+        log.close()
+      self.assertEqual(
+        '\033[36m❋ Hello \033[0m\n  a : 1\n\033]0;Not logged\007'
+        '\033[32m✓ Not logged either \033[0m\n',
+        buffer.getvalue(),
+      )
+      self.assertEqual('❋ Hello \n  a : 1\n', path.read_text())
+      self.assertEqual([path], list(path.parent.iterdir()))
+
+  def test_tee_rotate(self) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+      path = pathlib.Path(tmp, 'out.log')
+      with contextlib.redirect_stdout(io.StringIO()):
+        with volant.tee(path, max_bytes=15, keep=2):
+          for word in ['one', 'two', 'three', 'four', 'five']:
+            volant.result(word)
+      rotated = sorted(path.parent.glob('out.log.*.gz'))
+      self.assertEqual(2, len(rotated))
+      self.assertEqual(
+        ['→ three \n', '→ four \n'],
+        [gzip.decompress(p.read_bytes()).decode() for p in rotated],
+      )
+      self.assertEqual('→ five \n', path.read_text())
+
+    with tempfile.TemporaryDirectory() as tmp:
+      path = pathlib.Path(tmp, 'out.log')
+      with contextlib.redirect_stdout(io.StringIO()):
+        with unittest.mock.patch(
+          'time.monotonic', side_effect=[0, 0.1, 0.5, 0.6]
+        ):
+          with volant.tee(path, interval=0.5, keep=None, compress=False):
+            volant.result('one')
+            volant.result('two')
+            volant.result('three')
+      rotated = sorted(path.parent.glob('out.log.*'))
+      self.assertEqual(['→ one \n→ two \n'], [p.read_text() for p in rotated])
+      self.assertEqual('→ three \n', path.read_text())
+
+  def test_tee_archive(self) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+      path = pathlib.Path(tmp, 'out.log')
+      with contextlib.redirect_stdout(io.StringIO()) as buffer:
+        with volant.tee(path, max_bytes=20, keep=1):
+          for i in range(200):
+            volant.result(i)
+      self.assertNotIn('Could not archive', buffer.getvalue())
+      self.assertEqual(1, len(list(path.parent.glob('out.log.*'))))
+      self.assertEqual(1, len(list(path.parent.glob('out.log.*.gz'))))
+
+    with tempfile.TemporaryDirectory() as tmp:
+      path = pathlib.Path(tmp, 'out.log')
+      with contextlib.redirect_stdout(io.StringIO()) as buffer:
+        with unittest.mock.patch('gzip.open', side_effect=OSError('Disk full')):
+          with volant.tee(path, max_bytes=15):
+            volant.result('one')
+            volant.result('two')
+      self.assertRegex(
+        buffer.getvalue(), r'! Could not archive .*out\.log\.\d+T\d+: Disk full'
+      )
+      self.assertEqual(1, len(list(path.parent.glob('out.log.*'))))
+
+    with tempfile.TemporaryDirectory() as tmp:
+      path = pathlib.Path(tmp, 'out.log')
+      with contextlib.redirect_stdout(io.StringIO()):
+        with unittest.mock.patch(
+          'threading.Thread.start', side_effect=RuntimeError
+        ) as start:
+          with volant.tee(path, max_bytes=15):
+            volant.result('one')
+            volant.result('two')
+            self.assertEqual(1, len(list(path.parent.glob('out.log.*.gz'))))
+          start.assert_called_once_with()
+      self.assertEqual('→ two \n', path.read_text())
+
+  def test_tee_atexit(self) -> None:
+    script = """
+import atexit, sys, volant
+volant.tee(sys.argv[1], max_bytes=50)
+atexit.register(lambda: [volant.result(i) for i in range(20)])
+"""
+    with tempfile.TemporaryDirectory() as tmp:
+      path = pathlib.Path(tmp, 'out.log')
+      process = subprocess.run(
+        [sys.executable, '-c', script, path],
+        capture_output=True,
+        check=False,
+        env={**os.environ, 'PYTHONPATH': os.pathsep.join(sys.path)},
+        text=True,
+      )
+      self.assertEqual('', process.stderr)
+      self.assertEqual(0, process.returncode)
+      rotated = sorted(path.parent.glob('out.log.*'))
+      self.assertTrue(rotated)
+      self.assertTrue(all(p.suffix == '.gz' for p in rotated))
+      self.assertEqual(
+        ''.join(f'→ {i} \n' for i in range(20)),
+        ''.join(gzip.decompress(p.read_bytes()).decode() for p in rotated)
+        + path.read_text(),
+      )
+
+  def test_tee_usage(self) -> None:
+    script = """
+import sys, volant
+volant.usage()
+volant.tee(sys.argv[1])
+volant.message('Working')
+"""
+    with tempfile.TemporaryDirectory() as tmp:
+      path = pathlib.Path(tmp, 'out.log')
+      process = subprocess.run(
+        [sys.executable, '-c', script, path],
+        capture_output=True,
+        check=False,
+        env={**os.environ, 'PYTHONPATH': os.pathsep.join(sys.path)},
+        text=True,
+      )
+      self.assertEqual('', process.stderr)
+      self.assertEqual(0, process.returncode)
+      log = path.read_text()
+      self.assertTrue(log.startswith('❋ Working \n'))
+      self.assertIn('│ Resource Usage', log)
+      self.assertIn('Wall time : ', log)
+
+    with tempfile.TemporaryDirectory() as tmp:
+      path = pathlib.Path(tmp, 'out.log')
+      with contextlib.redirect_stdout(io.StringIO()):
+        first, second = volant.tee(path), volant.tee(path)
+        volant.message('Both')
+        volant._close_sinks()
+        volant.message('Neither')
+      self.assertNotIn(first, volant._sinks)
+      self.assertNotIn(second, volant._sinks)
+      self.assertEqual('❋ Both \n❋ Both \n', path.read_text())
+
+  def test_tee_die(self) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+      path = pathlib.Path(tmp, 'out.log')
+      with contextlib.redirect_stdout(io.StringIO()):
+        with volant.tee(path):
+          with self.assertRaises(SystemExit):
+            volant.die('Out of cheese.')
+          self.assertEqual('! Out of cheese. \n', path.read_text())
+
+  def test_profile(self) -> None:
+    with self.assertRaises(ValueError):
+      volant.profile(rate=0)
+    with self.assertRaises(ValueError):
+      volant.profile(top=0)
+
+    o, i = volant.dump.__code__, volant.indent.__code__
+    src = volant.tilde(o.co_filename)
+    outer = f'dump ({src}:{o.co_firstlineno})'
+    outer_site = f'dump ({src}:{o.co_firstlineno + 2})'
+    inner_site = f'indent ({src}:{i.co_firstlineno + 3})'
+
+    inner = f'indent ({src}:{i.co_firstlineno})'
+    pad = max(len(outer), len(inner))
+    site_pad = max(len(outer_site), len(inner_site))
+
+    p = volant.profile(top=2)
+    p.samples[((o, o.co_firstlineno + 2),)] = 1
+    p.samples[((o, o.co_firstlineno + 2), (i, i.co_firstlineno + 3))] = 3
+    p.elapsed = datetime.timedelta(seconds=65)
+    with io.StringIO() as buffer:
+      with contextlib.redirect_stdout(buffer):
+        p.report()
+      self.assertEqual(
+        [
+          '│ Functions · 4 samples in 1m 05s',
+          f'  {inner:>{pad}} :  75.0% self   75.0% total',
+          f'  {outer:>{pad}} :  25.0% self  100.0% total',
+          '│ Call Sites · 4 samples in 1m 05s',
+          f'  {inner_site:>{site_pad}} :  75.0%',
+          f'  {outer_site:>{site_pad}} :  25.0%',
+        ],
+        [
+          line.rstrip(' │')
+          for line in buffer.getvalue().splitlines()
+          if not line.startswith(('╭', '╰'))
+        ],
+      )
+
+    with tempfile.TemporaryDirectory() as tmp:
+      path = pathlib.Path(tmp, 'stacks.txt')
+      p.write_collapsed(path)
+      self.assertEqual(
+        f'{outer_site} 1\n{outer_site};{inner_site} 3\n', path.read_text()
+      )
+
+    p.elapsed = datetime.timedelta(milliseconds=250)
+    with contextlib.redirect_stdout(io.StringIO()) as buffer:
+      p.report()
+    self.assertIn('│ Functions · 4 samples in 0.250s ', buffer.getvalue())
+
+    with contextlib.redirect_stdout(io.StringIO()) as buffer:
+      with volant.profile(rate=1) as p:
+        pass
+    self.assertEqual({}, p.samples)
+    self.assertRegex(
+      buffer.getvalue(), r'^\033\[36m❋ No samples in 0\.\d{3}s \033\[0m\n$'
+    )
+
+    def samplers() -> list[threading.Thread]:
+      return [t for t in threading.enumerate() if t.name == 'volant-profile']
+
+    with contextlib.redirect_stdout(io.StringIO()):
+      with volant.profile(rate=1) as p:
+        with self.assertRaises(RuntimeError):
+          p.__enter__()
+        self.assertEqual(1, len(samplers()))
+      self.assertEqual([], samplers())
+      with p:
+        pass
+    self.assertEqual([], samplers())
+
+  def test_profile_sampling(self) -> None:
+    def leaf() -> None:
+      deadline = time.monotonic() + 0.1
+      while time.monotonic() < deadline:
+        pass
+
+    def mid() -> None:
+      leaf()
+
+    def rows(output: str) -> list[str]:
+      return [line.split(' (')[0].strip() for line in output.splitlines()]
+
+    with tempfile.TemporaryDirectory() as tmp:
+      path = pathlib.Path(tmp, 'stacks.txt')
+      with contextlib.redirect_stdout(io.StringIO()) as buffer:
+        with volant.profile(rate=1000, collapsed=path) as p:
+          mid()
+      here = VolantTest.test_profile_sampling.__code__
+      self.assertTrue(p.samples)
+      self.assertEqual({here}, {stack[0][0] for stack in p.samples})
+      self.assertEqual(leaf.__qualname__, rows(buffer.getvalue())[3])
+      self.assertTrue(
+        all(
+          line.startswith(f'{here.co_qualname} (')
+          for line in path.read_text().splitlines()
+        )
+      )
+
+    with contextlib.redirect_stdout(io.StringIO()) as buffer:
+      volant.profile(rate=1000)(mid)()
+    self.assertEqual(leaf.__qualname__, rows(buffer.getvalue())[3])
+    self.assertNotIn('call', buffer.getvalue())
+
+    frame = sys._getframe()
+    stop = unittest.mock.Mock(spec=threading.Event)
+    stop.is_set.return_value = False
+    p = volant.profile()
+    for skip, samples in [(volant._depth(frame) - 1, 2), (99, 0)]:
+      with self.subTest(skip):
+        stop.wait.side_effect = [False, False, True]
+        with unittest.mock.patch(
+          'sys._current_frames', return_value={7: frame}
+        ):
+          p.samples.clear()
+          p._skip = skip
+          p._sample(7, stop)
+        self.assertEqual(samples, p.samples.total())
+
+    stop.wait.side_effect = [False, True]
+    stop.is_set.return_value = True
+    with unittest.mock.patch('sys._current_frames', return_value={7: frame}):
+      p.samples.clear()
+      p._sample(7, stop)
+    self.assertEqual(0, p.samples.total())
+
+  def test_usage(self) -> None:
+    own = resource.struct_rusage(
+      (1.25, 0.5, 30_744, 0, 0, 0, 6_206, 1, 0, 144, 16, 0, 0, 0, 21, 2_024)
+    )
+    children = resource.struct_rusage(
+      (123.4, 0.016, 2_048, 0, 0, 0, 15, 0, 0, 0, 8, 0, 0, 0, 3, 1)
+    )
+    idle = resource.struct_rusage((0.0, 0.0) + (0,) * 14)
+
+    with tempfile.TemporaryDirectory() as tmp:
+      path = pathlib.Path(tmp, 'usage.jsonl')
+      with contextlib.ExitStack() as stack:
+        register = stack.enter_context(unittest.mock.patch('atexit.register'))
+        start = stack.enter_context(unittest.mock.patch('tracemalloc.start'))
+        stack.enter_context(
+          unittest.mock.patch('tracemalloc.is_tracing', return_value=True)
+        )
+        stack.enter_context(
+          unittest.mock.patch(
+            'tracemalloc.get_traced_memory', return_value=(1, 8_052_911)
+          )
+        )
+        stack.enter_context(
+          unittest.mock.patch('resource.getrusage', side_effect=[own, children])
+        )
+        stack.enter_context(
+          unittest.mock.patch('time.monotonic', side_effect=[10, 75.5])
+        )
+        stack.enter_context(unittest.mock.patch('sys.platform', 'linux'))
+        stack.enter_context(unittest.mock.patch('sys.argv', ['backup', '-v']))
+        stack.enter_context(
+          time_machine.travel(
+            datetime.datetime(
+              2025, 12, 25, 11, 34, 57, tzinfo=zoneinfo.ZoneInfo('UTC')
+            ),
+            tick=False,
+          )
+        )
+        path.write_text('{}\n')
+        volant.usage(memory=True, jsonl=path)
+        start.assert_called_once_with()
+        hook, *args = register.call_args.args
+        self.assertStdout(kUsage, lambda: hook(*args))
+
+      lines = path.read_text().splitlines()
+      self.assertEqual(2, len(lines))
+      record = json.loads(lines[1])
+      self.assertEqual(['backup', '-v'], record['argv'])
+      self.assertEqual(65.5, record['wall_seconds'])
+      self.assertEqual(8_052_911, record['tracemalloc_peak_bytes'])
+      self.assertEqual(31_481_856, record['self']['max_rss_bytes'])
+      self.assertEqual(123.4, record['children']['user_seconds'])
+      self.assertEqual(
+        datetime.datetime(2025, 12, 25, 11, 34, 57, tzinfo=datetime.UTC),
+        datetime.datetime.fromisoformat(record['time']),
+      )
+
+    with contextlib.ExitStack() as stack:
+      register = stack.enter_context(unittest.mock.patch('atexit.register'))
+      stack.enter_context(
+        unittest.mock.patch('tracemalloc.is_tracing', return_value=False)
+      )
+      stack.enter_context(
+        unittest.mock.patch('resource.getrusage', side_effect=[own, idle])
+      )
+      stack.enter_context(
+        unittest.mock.patch('time.monotonic', side_effect=[0, 2])
+      )
+      stack.enter_context(unittest.mock.patch('sys.platform', 'darwin'))
+      volant.usage()
+      hook, *args = register.call_args.args
+      with contextlib.redirect_stdout(io.StringIO()) as buffer:
+        hook(*args)
+      self.assertIn('     Wall time : 2.000s\n', buffer.getvalue())
+      self.assertIn('      Peak RSS : 30.0 KiB\n', buffer.getvalue())
+      self.assertNotIn('Python peak', buffer.getvalue())
+      self.assertNotIn('Child Processes', buffer.getvalue())
+
+    with tempfile.TemporaryDirectory() as tmp:
+      path = pathlib.Path(tmp, 'runs', 'backup', 'usage.jsonl')
+      with unittest.mock.patch('atexit.register') as register:
+        volant.usage(jsonl=path)
+      hook, *args = register.call_args.args
+      with contextlib.redirect_stdout(io.StringIO()):
+        hook(*args)
+      self.assertEqual(1, len(path.read_text().splitlines()))
+
+    with unittest.mock.patch.dict(sys.modules, {'resource': None}):
+      with unittest.mock.patch('atexit.register') as register:
+        with self.assertRaises(ImportError):
+          volant.usage()
+      register.assert_not_called()
+
+  def test_capture(self) -> None:
+    with contextlib.redirect_stdout(io.StringIO()) as buffer:
+      with volant.capture() as out:
+        volant.message('Hello', 42)
+        volant.map({'a': 1})
+        volant.title('Busy')
+        with volant.capture() as inner:
+          volant.success('Inner')
+        volant.error('Oops')
+      volant.result('After')
+    self.assertEqual('\033[35m→ After \033[0m\n', buffer.getvalue())
+    self.assertEqual(['✓ Inner \n'], [r.plain for r in inner.records])
+    self.assertEqual(
+      [
+        volant.Record('message', ('Hello', 42), '\033[36m❋ Hello 42 \033[0m\n'),
+        volant.Record('map', ('  a : 1',), '  a : 1\n'),
+        volant.Record('title', ('\033]0;Busy\007',), '\033]0;Busy\007'),
+        volant.Record('error', ('Oops',), '\033[31m! Oops \033[0m\n'),
+      ],
+      out.records,
+    )
+    self.assertEqual('❋ Hello 42 \n  a : 1\n! Oops \n', out.plain)
+    self.assertEqual(
+      '\033[36m❋ Hello 42 \033[0m\n  a : 1\n\033]0;Busy\007'
+      '\033[31m! Oops \033[0m\n',
+      out.text,
+    )
+    out.clear()
+    self.assertEqual([], out.records)
+
+    with volant.capture() as out:
+      with unittest.mock.patch('time.sleep'):
+        volant.wait(2)
+    self.assertEqual({'wait'}, {r.level for r in out.records})
+    self.assertEqual(
+      '\033[33m⏲ Waiting 2s \033[0m\n'
+      '  ..                                                            2s\n',
+      out.text,
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+      path = pathlib.Path(tmp, 'out.log')
+      with volant.tee(path), volant.capture() as out:
+        volant.message('Both')
+      self.assertEqual('❋ Both \n', path.read_text())
+      self.assertEqual('❋ Both \n', out.plain)
+
+  def test_capture_threads(self) -> None:
+    barrier = threading.Barrier(8)
+    plain: dict[int, str] = {}
+
+    def work(n: int) -> None:
+      with volant.capture() as out:
+        barrier.wait()
+        for i in range(50):
+          volant.result(n, i)
+        barrier.wait()
+      plain[n] = out.plain
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(
+      {n: ''.join(f'→ {n} {i} \n' for i in range(50)) for n in range(8)},
+      plain,
+    )
+
+    with contextlib.redirect_stdout(io.StringIO()) as buffer:
+      with volant.capture() as out:
+        context = contextvars.copy_context()
+        for target in [
+          lambda: volant.result('Own'),
+          lambda: context.run(volant.result, 'Fed'),
+        ]:
+          thread = threading.Thread(target=target)
+          thread.start()
+          thread.join()
+    self.assertEqual('\033[35m→ Own \033[0m\n', buffer.getvalue())
+    self.assertEqual('→ Fed \n', out.plain)
+
+  def test_capture_shared(self) -> None:
+    barrier = threading.Barrier(4)
+
+    def work(n: int) -> None:
+      with shared:
+        barrier.wait()
+        volant.result(n)
+        barrier.wait()
+      volant.result('After', n)
+
+    with contextlib.redirect_stdout(io.StringIO()) as buffer:
+      with volant.capture() as shared:
+        with concurrent.futures.ThreadPoolExecutor(4) as pool:
+          for future in [pool.submit(work, n) for n in range(4)]:
+            future.result()
+    self.assertEqual({(n,) for n in range(4)}, {r.args for r in shared.records})
+    self.assertEqual(4, buffer.getvalue().count('After'))
+
+    async def task(name: str) -> None:
+      with shared:
+        volant.message(name)
+        await asyncio.sleep(0)
+      volant.message('After', name)
+
+    async def main() -> None:
+      await asyncio.gather(task('A'), task('B'))
+
+    shared.clear()
+    with contextlib.redirect_stdout(io.StringIO()) as buffer:
+      asyncio.run(main())
+    self.assertEqual('❋ A \n❋ B \n', shared.plain)
+    self.assertEqual(2, buffer.getvalue().count('After'))
+
+  def test_capture_async(self) -> None:
+    async def task(name: str) -> str:
+      with volant.capture() as out:
+        volant.message(name)
+        await asyncio.sleep(0)
+        volant.message(name)
+      return out.plain
+
+    async def main() -> list[str]:
+      return list(await asyncio.gather(task('A'), task('B')))
+
+    self.assertEqual(['❋ A \n❋ A \n', '❋ B \n❋ B \n'], asyncio.run(main()))
+
+  def test_capture_golden(self) -> None:
+    with volant.capture() as out:
+      volant.message('Hello')
+      volant.bullets(['a', 'b'])
+
+    with tempfile.TemporaryDirectory() as tmp:
+      path = pathlib.Path(tmp, 'golden', 'hello.txt')
+      with self.assertRaises(FileNotFoundError):
+        out.golden(path)
+
+      out.golden(path, update=True)
+      self.assertEqual('❋ Hello \n  ⁃ a\n  ⁃ b\n', path.read_text())
+      out.golden(path)
+
+      path.write_text('❋ Goodbye \n  ⁃ a\n  ⁃ b\n')
+      with self.assertRaises(AssertionError) as context:
+        out.golden(path)
+      self.assertIn('-❋ Goodbye \n+❋ Hello \n', str(context.exception))
+
+      with unittest.mock.patch.dict(os.environ, {'VOLANT_UPDATE_GOLDEN': '1'}):
+        out.golden(path, ansi=True)
+      self.assertEqual(out.text, path.read_text())
+      out.golden(path, ansi=True)
+      with self.assertRaises(AssertionError):
+        out.golden(path)